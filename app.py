@@ -2,22 +2,26 @@
 GSC Explorer - Main Application
 A simple tool for exploring Google Search Console keyword-page performance data
 """
+import hashlib
 import logging
 import streamlit as st
+import numpy as np
 import pandas as pd
-import sqlite3
 from pathlib import Path
 
 from modules.utils import (
     is_first_run,
     get_db_path,
+    get_db_connection,
+    get_cache_dir,
     load_config,
     get_config_path
 )
-from modules.setup import run_setup_flow
+from modules.setup import run_setup_flow, init_database
 from modules.gsc_client import (
     get_gsc_service,
-    fetch_keyword_page_data,
+    reset_gsc_service,
+    fetch_keywords_page_data_bulk,
     pivot_to_monthly_columns
 )
 
@@ -25,6 +29,14 @@ from modules.gsc_client import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Derived frames share memory with their source until written to; this is
+# always on (and the option deprecated) from pandas 3
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Rows sent to the browser per results page
+RESULTS_PAGE_SIZE = 200
+
 # Page config
 st.set_page_config(
     page_title="GSC Explorer",
@@ -34,6 +46,40 @@ st.set_page_config(
 )
 
 
+def _keyword_cache_path(domain: str) -> Path:
+    """Get the feather sidecar path holding the keyword list for a domain."""
+    digest = hashlib.sha1((domain or '').encode('utf-8')).hexdigest()[:16]
+    return get_cache_dir() / f"keywords_{digest}.feather"
+
+
+def _read_keyword_cache(domain: str):
+    """Return the cached keyword list if it is newer than the database, else None."""
+    cache_path = _keyword_cache_path(domain)
+    db_path = get_db_path()
+    # In WAL mode recent writes land in the -wal file before a checkpoint
+    wal_path = db_path.with_name(db_path.name + '-wal')
+    try:
+        db_mtime = db_path.stat().st_mtime
+        if wal_path.exists():
+            db_mtime = max(db_mtime, wal_path.stat().st_mtime)
+        if cache_path.stat().st_mtime < db_mtime:
+            return None
+        return pd.read_feather(cache_path)['keyword'].tolist()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Error reading keyword cache: {e}")
+        return None
+
+
+def _write_keyword_cache(domain: str, keywords: list) -> None:
+    """Persist the keyword list for a domain next to the database."""
+    try:
+        pd.DataFrame({'keyword': keywords}).to_feather(_keyword_cache_path(domain))
+    except Exception as e:
+        logger.warning(f"Error writing keyword cache: {e}")
+
+
 @st.cache_data
 def load_keywords_from_db(domain: str = None):
     """Load keywords from database, optionally filtered by domain."""
@@ -42,30 +88,85 @@ def load_keywords_from_db(domain: str = None):
     if not db_path.exists():
         return []
     
+    # Keyword lists are served from the sidecar until the database changes
+    cached = _read_keyword_cache(domain)
+    if cached is not None:
+        return cached
+    
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_db_connection()
+        init_database(conn)
         
         if domain:
             query = "SELECT DISTINCT keyword FROM keywords WHERE domain = ? ORDER BY keyword"
-            df = pd.read_sql_query(query, conn, params=(domain,))
+            params = (domain,)
         else:
             query = "SELECT DISTINCT keyword FROM keywords ORDER BY keyword"
-            df = pd.read_sql_query(query, conn)
+            params = ()
         
-        conn.close()
+        if logger.isEnabledFor(logging.DEBUG):
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            logger.debug(f"Keyword query plan: {[step[-1] for step in plan]}")
         
-        return df['keyword'].tolist()
+        result = [row[0] for row in conn.execute(query, params)]
+        
+        _write_keyword_cache(domain, result)
+        
+        return result
     except Exception as e:
         logger.error(f"Error loading keywords: {e}")
         return []
 
 
+# NumPy 2's variable-width strings size the keyword array by total text;
+# a fixed-width str array would pad every keyword to the longest one
+_HAS_STRING_DTYPE = hasattr(np, 'strings') and hasattr(getattr(np, 'dtypes', None), 'StringDType')
+
+
+@st.cache_resource(max_entries=4)
+def _lower_array(keywords_version, _keywords):
+    """Build a lowercase array of keywords once for vectorized search."""
+    lowered = [kw.lower() for kw in _keywords]
+    if _HAS_STRING_DTYPE:
+        return np.array(lowered, dtype=np.dtypes.StringDType())
+    return np.array(lowered, dtype=object)
+
+
+@st.cache_data(max_entries=64)
+def _filter_keywords_cached(keywords_version, search_lower, _keywords):
+    """Filter keywords by a lowercase search term, memoized per keyword list version."""
+    lower_keywords = _lower_array(keywords_version, _keywords)
+    if _HAS_STRING_DTYPE:
+        mask = np.strings.find(lower_keywords, search_lower) >= 0
+    else:
+        mask = [search_lower in kw for kw in lower_keywords]
+    return [kw for kw, matched in zip(_keywords, mask) if matched]
+
+
 def filter_keywords(keywords, search_term):
     """Filter keywords based on search term."""
     if not search_term:
         return keywords
-    search_lower = search_term.lower()
-    return [kw for kw in keywords if search_lower in kw.lower()]
+    # Cheap C-level hash identifies the keyword list, so Streamlit never has
+    # to hash the list itself
+    keywords_version = hash(tuple(keywords))
+    return _filter_keywords_cached(keywords_version, search_term.lower(), keywords)
+
+
+def _category_mask(series, values):
+    """Boolean mask of rows whose categorical value is in values, compared by code."""
+    categories = series.cat.categories
+    wanted_codes = categories.get_indexer(values)
+    return np.isin(series.cat.codes.to_numpy(), wanted_codes[wanted_codes >= 0])
+
+
+def build_result_filters(result_df):
+    """Compute sorted filter options for the results table once per fetch."""
+    return {
+        'keywords': sorted(result_df['Keyword'].cat.categories.tolist()),
+        'pages': sorted(result_df['Page'].cat.categories.tolist()),
+        'metrics': sorted(result_df['Metric'].cat.categories.tolist())
+    }
 
 
 def display_filtered_results(result_df):
@@ -73,10 +174,15 @@ def display_filtered_results(result_df):
     st.markdown("---")
     st.header("Results")
     
-    # Extract unique keywords, pages, and metrics for filters
-    unique_keywords = sorted(result_df['Keyword'].unique().tolist())
-    unique_pages = sorted(result_df['Page'].unique().tolist())
-    unique_metrics = sorted(result_df['Metric'].unique().tolist())
+    # Reuse filter options computed when the results were built
+    result_filters = st.session_state.get('result_filters')
+    if result_filters is None:
+        result_filters = build_result_filters(result_df)
+        st.session_state.result_filters = result_filters
+    
+    unique_keywords = result_filters['keywords']
+    unique_pages = result_filters['pages']
+    unique_metrics = result_filters['metrics']
     
     # Add filters in columns
     col1, col2, col3 = st.columns(3)
@@ -105,38 +211,71 @@ def display_filtered_results(result_df):
             key="filter_metric"
         )
     
-    # Apply filters
-    filtered_df = result_df.copy()
-    
-    if selected_keyword != "All":
-        filtered_df = filtered_df[filtered_df['Keyword'] == selected_keyword]
-    
-    if selected_pages:
-        filtered_df = filtered_df[filtered_df['Page'].isin(selected_pages)]
-    
-    if selected_metric != "All":
-        filtered_df = filtered_df[filtered_df['Metric'] == selected_metric]
+    # Apply filters as one combined mask, then select rows once. Predicates
+    # compare integer category codes; numexpr (DataFrame.query) has no string
+    # or categorical support, so it would not speed these up.
+    filters_active = selected_keyword != "All" or bool(selected_pages) or selected_metric != "All"
     
-    # Show filter info
-    if selected_keyword != "All" or selected_pages or selected_metric != "All":
+    if filters_active:
+        mask = np.ones(len(result_df), dtype=bool)
+        
+        if selected_keyword != "All":
+            mask &= _category_mask(result_df['Keyword'], [selected_keyword])
+        
+        if selected_pages:
+            mask &= _category_mask(result_df['Page'], selected_pages)
+        
+        if selected_metric != "All":
+            mask &= _category_mask(result_df['Metric'], [selected_metric])
+        
+        filtered_df = result_df.iloc[mask.nonzero()[0]]
+        
+        # Show filter info
         st.info(f"Showing {len(filtered_df)} of {len(result_df)} rows")
+    else:
+        # No filter: use the cached frame as is (TOTAL is added via assign)
+        filtered_df = result_df
     
     # Add TOTAL column (sum of all monthly columns for each row)
     if len(filtered_df) > 0:
         monthly_cols = [col for col in filtered_df.columns if col not in ['Keyword', 'Page', 'Metric']]
-        filtered_df['TOTAL'] = filtered_df[monthly_cols].sum(axis=1)
+        # Reduce in numpy; nansum keeps pandas' skip-NaN semantics for missing months
+        monthly_values = filtered_df[monthly_cols].to_numpy(dtype=np.float64)
+        filtered_df = filtered_df.assign(TOTAL=np.nansum(monthly_values, axis=1))
         
         # Reorder columns: Keyword, Page, Metric, monthly columns, TOTAL
         display_df = filtered_df[['Keyword', 'Page', 'Metric'] + monthly_cols + ['TOTAL']]
     else:
         display_df = filtered_df
     
-    # Display table with built-in download
+    # Only ship the current page of rows to the browser
+    total_pages = max(1, -(-len(display_df) // RESULTS_PAGE_SIZE))
+    page_number = 1
+    if total_pages > 1:
+        page_number = st.number_input(
+            f"Page (of {total_pages})",
+            min_value=1,
+            max_value=total_pages,
+            value=1,
+            step=1,
+            key=f"results_page_{total_pages}"
+        )
+    offset = (page_number - 1) * RESULTS_PAGE_SIZE
+    
     st.dataframe(
-        display_df,
+        display_df.iloc[offset:offset + RESULTS_PAGE_SIZE],
         use_container_width=True,
         height=600
     )
+    
+    # Full export is serialized only when requested
+    if st.checkbox("Prepare CSV export of all rows", key="prepare_csv"):
+        st.download_button(
+            "⬇️ Download all as CSV",
+            data=display_df.to_csv(index=False).encode('utf-8'),
+            file_name="gsc_explorer_results.csv",
+            mime="text/csv"
+        )
 
 
 def main_app():
@@ -184,7 +323,7 @@ def main_app():
     with st.sidebar:
         st.header("Keyword Selection")
         
-        # Search bar
+        # Search bar (st.text_input only reruns on Enter or blur, not per keystroke)
         search_term = st.text_input("🔍 Search keywords", placeholder="Type to filter...")
         
         # Filter keywords
@@ -202,14 +341,20 @@ def main_app():
             if 'selected_keywords' not in st.session_state:
                 st.session_state.selected_keywords = set()
             
-            # Handle select all
+            # Handle select all; only unchecking it (True -> False) clears the
+            # visible keywords, so selections made under other searches stay
             if select_all:
-                st.session_state.selected_keywords = set(filtered_keywords)
-            elif not select_all and len(st.session_state.selected_keywords) == len(filtered_keywords):
-                if all(kw in st.session_state.selected_keywords for kw in filtered_keywords):
-                    st.session_state.selected_keywords = set()
+                st.session_state.selected_keywords.update(filtered_keywords)
+            elif st.session_state.get('select_all_prev'):
+                st.session_state.selected_keywords.difference_update(filtered_keywords)
+            
+            # The editor keeps its per-row edits while its key is unchanged, so
+            # start a fresh editor whenever Select All is toggled
+            if select_all != st.session_state.get('select_all_prev', False):
+                st.session_state.kw_editor_version = st.session_state.get('kw_editor_version', 0) + 1
+            st.session_state.select_all_prev = select_all
             
-            # Keyword checkboxes (scrollable, limit to 500 for performance)
+            # Keyword selection table (scrollable, limit to 500 for performance)
             st.markdown("---")
             st.markdown("**Select keywords:**")
             
@@ -217,12 +362,26 @@ def main_app():
             if len(filtered_keywords) > 500:
                 st.warning(f"Showing first 500 of {len(filtered_keywords)} keywords. Use search to narrow down.")
             
-            for keyword in display_keywords:
-                is_selected = keyword in st.session_state.selected_keywords
-                if st.checkbox(keyword, value=is_selected, key=f"kw_{keyword}"):
-                    st.session_state.selected_keywords.add(keyword)
-                else:
-                    st.session_state.selected_keywords.discard(keyword)
+            # One editor widget instead of a checkbox per keyword
+            editor_df = pd.DataFrame({
+                'selected': [kw in st.session_state.selected_keywords for kw in display_keywords],
+                'keyword': display_keywords
+            })
+            edited_df = st.data_editor(
+                editor_df,
+                column_config={
+                    'selected': st.column_config.CheckboxColumn("✓", width="small"),
+                    'keyword': st.column_config.TextColumn("Keyword")
+                },
+                disabled=['keyword'],
+                hide_index=True,
+                use_container_width=True,
+                key=f"kw_editor_{search_term}_{st.session_state.get('kw_editor_version', 0)}"
+            )
+            
+            edited_selected = set(edited_df.loc[edited_df['selected'], 'keyword'])
+            st.session_state.selected_keywords.difference_update(display_keywords)
+            st.session_state.selected_keywords.update(edited_selected)
             
             # Show selected count
             selected_count = len(st.session_state.selected_keywords)
@@ -291,7 +450,7 @@ def main_app():
                 token_path = get_token_path()
                 if token_path.exists():
                     token_path.unlink()
-                st.session_state.gsc_service = None
+                reset_gsc_service()
                 st.rerun()
             return
         except Exception as e:
@@ -304,7 +463,7 @@ def main_app():
                 token_path = get_token_path()
                 if token_path.exists():
                     token_path.unlink()
-                st.session_state.gsc_service = None
+                reset_gsc_service()
                 st.rerun()
             return
         
@@ -316,43 +475,43 @@ def main_app():
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        all_results = []
+        combined_df = None
         
-        # Fetch data for each keyword
+        # Fetch data for all keywords in one batched pass
         total_keywords = len(selected_keywords_list)
-        for idx, keyword in enumerate(selected_keywords_list):
-            status_text.text(f"Fetching data for: {keyword} ({idx + 1}/{total_keywords})")
-            
-            try:
-                # Fetch data
-                df = fetch_keyword_page_data(
-                    service,
-                    site_url_input,
-                    keyword,
-                    start_date=start_date,
-                    progress_callback=lambda curr, total: progress_bar.progress(
-                        (idx + (curr / total if total else 0)) / total_keywords
-                    ) if total else None
-                )
-                
-                if not df.empty:
-                    all_results.append(df)
-                
-            except Exception as e:
-                st.warning(f"Error fetching data for '{keyword}': {e}")
-                logger.error(f"Error fetching data for {keyword}: {e}", exc_info=True)
-                continue
-            
-            # Update progress
-            progress_bar.progress((idx + 1) / total_keywords)
+        status_text.text(f"Fetching data for {total_keywords} keyword(s)...")
+        
+        def update_progress(completed, total):
+            if total:
+                progress_bar.progress(min(completed / total, 1.0))
         
-        # Combine all results
-        if all_results:
-            combined_df = pd.concat(all_results, ignore_index=True)
+        try:
+            # Already one long frame for all keywords (None means nothing was found),
+            # so it is pivoted directly without a split/concat round trip
+            combined_df = fetch_keywords_page_data_bulk(
+                service,
+                site_url_input,
+                selected_keywords_list,
+                start_date=start_date,
+                progress_callback=update_progress
+            )
             
+            found = set(combined_df['query']) if combined_df is not None else set()
+            missing = set(selected_keywords_list) - found
+            if missing:
+                logger.info(f"No data found for {len(missing)} keyword(s)")
+        
+        except Exception as e:
+            st.warning(f"Error fetching data: {e}")
+            logger.error(f"Error fetching data for selected keywords: {e}", exc_info=True)
+        
+        progress_bar.progress(1.0)
+        
+        if combined_df is not None:
             # Pivot to monthly columns
             status_text.text("Processing data...")
             result_df = pivot_to_monthly_columns(combined_df)
+            del combined_df  # Release the long frame before rendering
             
             # Display results
             status_text.empty()
@@ -362,6 +521,7 @@ def main_app():
             
             # Store in session state for download
             st.session_state.result_df = result_df
+            st.session_state.result_filters = build_result_filters(result_df)
             
             # Add filters
             display_filtered_results(result_df)
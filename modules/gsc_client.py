@@ -3,21 +3,37 @@ Google Search Console API Client
 Handles authentication and data fetching from GSC API
 """
 import os
+import re
 import json
 import time
+import random
 import logging
+import sqlite3
+import threading
+from functools import lru_cache
+from itertools import chain, compress
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator
+from datetime import datetime, timedelta
 
+import httplib2
+import numpy as np
 import pandas as pd
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from modules.utils import get_token_path, get_credentials_path, generate_monthly_ranges
+from modules.utils import (
+    get_token_path,
+    get_credentials_path,
+    get_page_cache_path,
+    generate_monthly_ranges
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +43,160 @@ SCOPES = ['https://www.googleapis.com/auth/webmasters.readonly']
 # API limits
 MAX_ROWS_PER_REQUEST = 25000
 MAX_REQUESTS_PER_MINUTE = 1000  # Safety margin below 1200 QPM
-REQUEST_DELAY_SECONDS = 60 / MAX_REQUESTS_PER_MINUTE
+MAX_FETCH_WORKERS = 8
+SPECULATIVE_AFTER_BATCHES = 2  # Full pages seen before pages are batched
+SPECULATIVE_PAGES = 2  # Pages requested per batched round trip
+MAX_RETRY_ATTEMPTS = 6
+RETRYABLE_STATUSES = (429, 500, 503)
+# Burst allowance on top of the steady rate; burst + 1 minute of refill must
+# stay under the 1200 QPM hard limit
+REQUEST_BURST = 100
+
+# GSC caps regex filter expressions; stay safely below the documented limit
+MAX_REGEX_FILTER_LENGTH = 4000
+_RE2_METACHARACTERS = re.compile(r'[\\.^$|?*+()\[\]{}]')
+
+HTTP_TIMEOUT_SECONDS = 120
+
+# Page-data cache: GSC data for a date is final after a few days
+RECENT_DATA_DAYS = 3
+RECENT_MONTH_CACHE_TTL_SECONDS = 12 * 3600
+PAGE_CACHE_COLUMNS = ['page', 'clicks', 'impressions', 'position', 'ctr']
+PAGE_CACHE_TIMEOUT_SECONDS = 30
+
+# The user's property list rarely changes within a session
+SITES_CACHE_TTL_SECONDS = 300
+
+# Field extractors for Search Analytics response rows
+_ROW_KEYS = itemgetter('keys')
+_ROW_METRICS = itemgetter('clicks', 'impressions', 'position', 'ctr')
+
+
+class _ThreadLocalHttp:
+    """
+    Authorized HTTP transport that keeps a separate connection per thread.
+    
+    httplib2 connections are not thread-safe, so each thread (Streamlit
+    session or fetch worker) sends requests over its own keep-alive Http,
+    while all of them share the credentials.
+    """
+    
+    def __init__(self, credentials: Credentials):
+        self.credentials = credentials
+        self._local = threading.local()
+    
+    def _http(self) -> AuthorizedHttp:
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS))
+            self._local.http = http
+        return http
+    
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+    
+    def close(self):
+        http = getattr(self._local, 'http', None)
+        if http is not None:
+            http.close()
+            self._local.http = None
+
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket limiting API requests to a per-minute quota.
+    
+    acquire() returns immediately while under quota and only blocks once the
+    bucket is empty, unlike a fixed sleep after every call.
+    """
+    
+    def __init__(self, capacity: int, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Block until the requested number of tokens is available, then take them.
+        
+        Requests larger than the bucket are clamped to its capacity, since
+        they could otherwise never be satisfied.
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.refill_per_second
+                )
+                self.updated_at = now
+                
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                
+                wait_seconds = (tokens - self.tokens) / self.refill_per_second
+            
+            time.sleep(wait_seconds)
+
+
+# Shared by every caller (and thread) so total QPM stays within quota
+_bucket = _TokenBucket(REQUEST_BURST, MAX_REQUESTS_PER_MINUTE / 60.0)
+
+# Access token most recently written to the token file
+_last_written_token = None
+
+# The one GSC service for this process, shared by every session and worker
+# thread; the lock keeps concurrent callers from each running the OAuth
+# refresh and building their own service
+_svc_lock = threading.Lock()
+_svc_ref: Dict[str, object] = {}
+
+# list_sites results per service: id(service) -> (fetched_at, site URLs)
+_sites_cache: Dict[int, tuple] = {}
+
+
+@lru_cache(maxsize=1)
+def _load_token(token_file: str, mtime: float) -> Optional[Credentials]:
+    """
+    Load credentials from the token file.
+    
+    Cached on (path, mtime), so the JSON is only re-read when the file changes.
+    """
+    try:
+        with open(token_file, 'r') as f:
+            token_data = json.load(f)
+        creds = Credentials.from_authorized_user_info(token_data, SCOPES)
+        logger.info("Loaded credentials from token file")
+        return creds
+    except Exception as e:
+        logger.warning(f"Error loading token: {e}")
+        return None
+
+
+def _save_creds(creds: Credentials, token_file: Path) -> None:
+    """Atomically write credentials to the token file, skipping unchanged tokens."""
+    global _last_written_token
+    
+    if creds.token == _last_written_token and token_file.exists():
+        return
+    
+    token_data = {
+        'token': creds.token,
+        'refresh_token': creds.refresh_token,
+        'token_uri': creds.token_uri,
+        'client_id': creds.client_id,
+        'client_secret': creds.client_secret,
+        'scopes': creds.scopes
+    }
+    # Write to a temp file and swap it in, so a crash never leaves a torn token file
+    tmp_file = token_file.with_suffix('.tmp')
+    tmp_file.write_text(json.dumps(token_data))
+    os.replace(tmp_file, token_file)
+    _last_written_token = creds.token
 
 
 def get_credentials() -> Credentials:
@@ -48,14 +217,7 @@ def get_credentials() -> Credentials:
     
     # Load existing token
     if token_file.exists():
-        try:
-            with open(token_file, 'r') as f:
-                token_data = json.load(f)
-                creds = Credentials.from_authorized_user_info(token_data, SCOPES)
-                logger.info("Loaded credentials from token file")
-        except Exception as e:
-            logger.warning(f"Error loading token: {e}")
-            creds = None
+        creds = _load_token(str(token_file), token_file.stat().st_mtime)
     
     # If no valid credentials, run OAuth flow
     if not creds or not creds.valid:
@@ -67,16 +229,7 @@ def get_credentials() -> Credentials:
                 logger.info("Token refreshed successfully")
                 
                 # Save refreshed token
-                token_data = {
-                    'token': creds.token,
-                    'refresh_token': creds.refresh_token,
-                    'token_uri': creds.token_uri,
-                    'client_id': creds.client_id,
-                    'client_secret': creds.client_secret,
-                    'scopes': creds.scopes
-                }
-                with open(token_file, 'w') as f:
-                    json.dump(token_data, f)
+                _save_creds(creds, token_file)
             except Exception as e:
                 logger.warning(f"Error refreshing token: {e}")
                 creds = None
@@ -102,16 +255,7 @@ def get_credentials() -> Credentials:
         # Save credentials for next run (if we got new ones)
         if creds and creds.valid:
             try:
-                token_data = {
-                    'token': creds.token,
-                    'refresh_token': creds.refresh_token,
-                    'token_uri': creds.token_uri,
-                    'client_id': creds.client_id,
-                    'client_secret': creds.client_secret,
-                    'scopes': creds.scopes
-                }
-                with open(token_file, 'w') as f:
-                    json.dump(token_data, f)
+                _save_creds(creds, token_file)
                 logger.info("Credentials saved to token file")
             except Exception as e:
                 logger.warning(f"Error saving token: {e}")
@@ -119,53 +263,155 @@ def get_credentials() -> Credentials:
     return creds
 
 
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+    
+    Honors the server's Retry-After header when present, otherwise uses
+    exponential backoff capped at a minute, plus random jitter so that
+    concurrent workers do not retry in lockstep.
+    """
+    try:
+        delay = float(retry_after) if retry_after else 0
+    except ValueError:
+        delay = 0
+    if delay <= 0:
+        delay = min(2 ** attempt, 60)
+    return delay + random.uniform(0, delay * 0.5)
+
+
+def _execute(request, tokens: int = 1):
+    """
+    Execute an API request under the rate limiter, retrying transient errors.
+    
+    request may also be a batch, in which case tokens is the number of
+    requests it carries. Rate-limit (429) and server (500, 503) errors are
+    retried with backoff; other errors, or the last failed attempt, are raised.
+    """
+    for attempt in range(MAX_RETRY_ATTEMPTS):
+        _bucket.acquire(tokens)
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status not in RETRYABLE_STATUSES or attempt == MAX_RETRY_ATTEMPTS - 1:
+                raise
+            delay = _backoff_delay(attempt, e.resp.get('retry-after'))
+            logger.warning(f"API returned {e.resp.status}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def _execute_query_batch(service, site_url: str, request_bodies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run several Search Analytics queries in one batched HTTP round trip.
+    
+    The batch POST itself is retried on transient errors like any single
+    request. Sub-requests that fail inside the batch are re-run individually
+    through _execute, which retries transient errors and raises anything else.
+    Responses are returned in request order.
+    """
+    results = {}
+    
+    def _collect(request_id, response, exception):
+        results[request_id] = (response, exception)
+    
+    batch = service.new_batch_http_request(callback=_collect)
+    for idx, body in enumerate(request_bodies):
+        batch.add(
+            service.searchanalytics().query(siteUrl=site_url, body=body),
+            request_id=str(idx)
+        )
+    
+    _execute(batch, len(request_bodies))
+    
+    responses = []
+    for idx, body in enumerate(request_bodies):
+        response, exception = results.get(str(idx), (None, None))
+        if exception is not None or response is None:
+            response = _execute(service.searchanalytics().query(siteUrl=site_url, body=body))
+        responses.append(response)
+    
+    return responses
+
+
+def _build_service(creds: Credentials):
+    """
+    Build the GSC API service over a per-thread keep-alive transport.
+    
+    Each thread reuses its own persistent connection, avoiding a fresh
+    TCP + TLS handshake for every API call, so the service is safe to share
+    across threads.
+    """
+    # Use the discovery document bundled with google-api-python-client
+    # rather than fetching it over the network
+    return build(
+        'searchconsole',
+        'v1',
+        http=_ThreadLocalHttp(creds),
+        static_discovery=True,
+        cache_discovery=False
+    )
+
+
 def get_gsc_service():
     """
     Build and return GSC API service.
     
-    This function works in both Streamlit and non-Streamlit contexts.
-    In Streamlit, the service is cached in session state to avoid rebuilding.
+    The service is built once per process and shared by all callers;
+    call reset_gsc_service() to force re-authentication.
     """
-    # Try to use cached version if in Streamlit
-    try:
-        import streamlit as st
-        # Check if service is already in session state
-        if 'gsc_service' in st.session_state and st.session_state.gsc_service is not None:
-            return st.session_state.gsc_service
-        
-        # Build new service
-        creds = get_credentials()
-        service = build('searchconsole', 'v1', credentials=creds)
-        
-        # Cache in session state
-        st.session_state.gsc_service = service
-        return service
-    except (ImportError, RuntimeError, AttributeError):
-        # Not in Streamlit context, use direct approach
-        creds = get_credentials()
-        service = build('searchconsole', 'v1', credentials=creds)
-        return service
+    service = _svc_ref.get('default')
+    if service is None:
+        with _svc_lock:
+            # Another caller may have built it while we waited
+            service = _svc_ref.get('default')
+            if service is None:
+                creds = get_credentials()
+                service = _build_service(creds)
+                _svc_ref['default'] = service
+    return service
+
+
+def has_gsc_service() -> bool:
+    """Check whether an authenticated service has already been built."""
+    return 'default' in _svc_ref
+
+
+def reset_gsc_service():
+    """Drop the shared service so the next call re-authenticates."""
+    with _svc_lock:
+        _svc_ref.clear()
+        _sites_cache.clear()
 
 
 def list_sites(service) -> List[str]:
     """
     List all available GSC properties.
     
+    Results are reused for SITES_CACHE_TTL_SECONDS per service.
+    
     Args:
         service: GSC API service object
         
     Returns:
         List of site URLs
     """
+    key = id(service)
+    now = time.monotonic()
+    cached = _sites_cache.get(key)
+    if cached is not None and now - cached[0] < SITES_CACHE_TTL_SECONDS:
+        return list(cached[1])
+    
     try:
         sites = service.sites().list().execute()
-        return [site['siteUrl'] for site in sites.get('siteEntry', [])]
+        site_urls = [site['siteUrl'] for site in sites.get('siteEntry', [])]
+        _sites_cache[key] = (now, site_urls)
+        return list(site_urls)
     except Exception as e:
         logger.error(f"Error listing sites: {e}")
         raise
 
 
-def fetch_keywords_with_pagination(
+def iter_keyword_pages(
     service,
     site_url: str,
     start_date: str,
@@ -174,13 +420,17 @@ def fetch_keywords_with_pagination(
     min_clicks: Optional[int] = None,
     keyword_pattern: Optional[str] = None,
     progress_callback: Optional[callable] = None
-) -> List[str]:
+) -> Iterator[List[str]]:
     """
-    Fetch keywords from GSC API with pagination support.
+    Fetch keywords from GSC API page by page, yielding each page as it arrives.
     
     Handles 25K row limit by paginating through results.
     Throttles requests to stay within rate limits.
     
+    With only the 'query' dimension the API returns each keyword once for the
+    whole date range, so the metric filters can be applied per page and
+    callers can store keywords as they come in.
+    
     Args:
         service: GSC API service object
         site_url: GSC property URL
@@ -188,213 +438,505 @@ def fetch_keywords_with_pagination(
         end_date: End date (YYYY-MM-DD)
         min_impressions: Minimum impressions filter
         min_clicks: Minimum clicks filter (optional)
-        keyword_pattern: Keyword pattern filter (optional)
+        keyword_pattern: Keyword regex filter (optional), applied server-side
         progress_callback: Optional callback(current_count, total_estimated)
         
-    Returns:
-        List of unique keywords
+    Yields:
+        Lists of keywords passing the filters, one per API page
     """
-    all_keywords = []
-    keyword_metrics = {}  # Track impressions/clicks per keyword
+    # Push the keyword pattern to the API so non-matching rows are never paged
+    # through. Plain substrings use the (case-insensitive) 'contains' operator;
+    # anything else is sent as a case-insensitive RE2 regex.
+    dimension_filter_groups = None
+    if keyword_pattern:
+        if _RE2_METACHARACTERS.search(keyword_pattern) is None:
+            keyword_filter = {'dimension': 'query', 'operator': 'contains', 'expression': keyword_pattern}
+        else:
+            keyword_filter = {'dimension': 'query', 'operator': 'includingRegex', 'expression': f'(?i){keyword_pattern}'}
+        dimension_filter_groups = [{'filters': [keyword_filter]}]
+    
+    rows_fetched = 0
     start_row = 0
     batch_number = 0
     
     # Fetch all keywords (API doesn't support metric filtering)
-    while True:
+    done = False
+    while not done:
         batch_number += 1
-        logger.info(f"Fetching batch {batch_number}, start_row={start_row}")
+        
+        # Large properties: once a few full pages have come back, request the
+        # next pages together in one batched round trip
+        pages_per_round = SPECULATIVE_PAGES if batch_number > SPECULATIVE_AFTER_BATCHES else 1
+        logger.info(f"Fetching batch {batch_number}, start_row={start_row}, pages={pages_per_round}")
         
         try:
-            request_body = {
-                'startDate': start_date,
-                'endDate': end_date,
-                'dimensions': ['query'],
-                'rowLimit': MAX_ROWS_PER_REQUEST,
-                'startRow': start_row
-            }
-            
-            response = service.searchanalytics().query(
-                siteUrl=site_url,
-                body=request_body
-            ).execute()
+            request_bodies = []
+            for page in range(pages_per_round):
+                request_body = {
+                    'startDate': start_date,
+                    'endDate': end_date,
+                    'dimensions': ['query'],
+                    'rowLimit': MAX_ROWS_PER_REQUEST,
+                    'startRow': start_row + page * MAX_ROWS_PER_REQUEST
+                }
+                if dimension_filter_groups:
+                    request_body['dimensionFilterGroups'] = dimension_filter_groups
+                request_bodies.append(request_body)
             
+            if pages_per_round == 1:
+                responses = [_execute(service.searchanalytics().query(
+                    siteUrl=site_url,
+                    body=request_bodies[0]
+                ))]
+            else:
+                responses = _execute_query_batch(service, site_url, request_bodies)
+        
+        except HttpError as e:
+            logger.error(f"API error: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching keywords: {e}")
+            raise
+        
+        for response in responses:
             if 'rows' not in response:
+                done = True
                 break
             
-            # Collect keywords and their metrics
-            for row in response['rows']:
-                keyword = row['keys'][0]
-                impressions = row.get('impressions', 0)
-                clicks = row.get('clicks', 0)
-                
-                # Aggregate metrics per keyword (sum across all rows)
-                if keyword not in keyword_metrics:
-                    keyword_metrics[keyword] = {'impressions': 0, 'clicks': 0}
-                keyword_metrics[keyword]['impressions'] += impressions
-                keyword_metrics[keyword]['clicks'] += clicks
+            rows = response['rows']
+            rows_fetched += len(rows)
             
             # Call progress callback if provided
             if progress_callback:
-                progress_callback(len(keyword_metrics), None)
+                progress_callback(rows_fetched, start_row + MAX_ROWS_PER_REQUEST)
             
-            # Check if we got fewer rows than requested (last page)
-            if len(response['rows']) < MAX_ROWS_PER_REQUEST:
-                break
+            # Apply filters in code (API doesn't support metric filtering)
+            keep = np.ones(len(rows), dtype=bool)
+            if min_impressions > 0:
+                impressions = np.fromiter((row.get('impressions', 0) for row in rows), dtype=np.float64, count=len(rows))
+                keep &= impressions >= min_impressions
+            if min_clicks is not None and min_clicks > 0:
+                clicks = np.fromiter((row.get('clicks', 0) for row in rows), dtype=np.float64, count=len(rows))
+                keep &= clicks >= min_clicks
             
-            # Throttle to respect rate limits
-            time.sleep(REQUEST_DELAY_SECONDS)
+            yield list(compress((row['keys'][0] for row in rows), keep))
             
-            # Move to next batch
-            start_row += MAX_ROWS_PER_REQUEST
+            # Check if we got fewer rows than requested (last page);
+            # any speculative page after it is discarded
+            if len(rows) < MAX_ROWS_PER_REQUEST:
+                done = True
+                break
             
-        except HttpError as e:
-            if e.resp.status == 429:  # Quota exceeded
-                logger.warning("Rate limit exceeded, waiting...")
-                time.sleep(60)  # Wait 1 minute
+            # Move to next page
+            start_row += MAX_ROWS_PER_REQUEST
+
+
+def fetch_keywords_with_pagination(
+    service,
+    site_url: str,
+    start_date: str,
+    end_date: str,
+    min_impressions: int = 0,
+    min_clicks: Optional[int] = None,
+    keyword_pattern: Optional[str] = None,
+    progress_callback: Optional[callable] = None
+) -> List[str]:
+    """
+    Fetch keywords from GSC API with pagination support.
+    
+    Collects every page from iter_keyword_pages into one list.
+    
+    Args:
+        service: GSC API service object
+        site_url: GSC property URL
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        min_impressions: Minimum impressions filter
+        min_clicks: Minimum clicks filter (optional)
+        keyword_pattern: Keyword regex filter (optional), applied server-side
+        progress_callback: Optional callback(current_count, total_estimated)
+        
+    Returns:
+        List of unique keywords
+    """
+    pages = iter_keyword_pages(
+        service,
+        site_url,
+        start_date,
+        end_date,
+        min_impressions=min_impressions,
+        min_clicks=min_clicks,
+        keyword_pattern=keyword_pattern,
+        progress_callback=progress_callback
+    )
+    return list(dict.fromkeys(chain.from_iterable(pages)))
+
+
+def _aggregate_monthly_rows(rows: List[Dict[str, Any]], year_month: str) -> Optional[pd.DataFrame]:
+    """
+    Aggregate daily (query, page, date) rows into one row per query+page.
+    
+    Clicks and impressions are summed; position and CTR are averaged,
+    weighted by impressions. Sums are computed with numpy bincount over
+    factorized (query, page) codes.
+    Returns None if there are no rows.
+    """
+    if not rows:
+        return None
+    
+    # Pull all metric fields per row with one C-level itemgetter call into
+    # a single (n, 4) array, instead of a Python comprehension per column
+    keys = list(map(_ROW_KEYS, rows))
+    metrics = np.array(list(map(_ROW_METRICS, rows)), dtype=np.float64)
+    
+    impressions = metrics[:, 1]
+    
+    # Number each distinct (query, page) pair in order of first appearance,
+    # then sum every metric per pair with bincount
+    query_codes, queries = pd.factorize(np.array([key[0] for key in keys], dtype=object))
+    page_codes, pages = pd.factorize(np.array([key[1] for key in keys], dtype=object))
+    codes, pairs = pd.factorize(query_codes.astype(np.int64) * len(pages) + page_codes)
+    size = len(pairs)
+    
+    clicks_sum = np.bincount(codes, weights=metrics[:, 0], minlength=size)
+    impressions_sum = np.bincount(codes, weights=impressions, minlength=size)
+    wpos = np.bincount(codes, weights=metrics[:, 2] * impressions, minlength=size)
+    wctr = np.bincount(codes, weights=metrics[:, 3] * impressions, minlength=size)
+    
+    # Weighted averages; pages without impressions report 0
+    has_impressions = impressions_sum > 0
+    divisor = np.where(has_impressions, impressions_sum, 1)
+    
+    return pd.DataFrame({
+        'query': queries[pairs // len(pages)],
+        'page': pages[pairs % len(pages)],
+        'year_month': year_month,
+        'clicks': clicks_sum.astype(np.int64),
+        'impressions': impressions_sum.astype(np.int64),
+        'position': np.where(has_impressions, wpos / divisor, 0),
+        'ctr': np.where(has_impressions, wctr / divisor, 0)
+    })
+
+
+def _open_page_cache() -> sqlite3.Connection:
+    """
+    Open the local page-data cache, creating its table if needed.
+    
+    WAL and a generous busy timeout let concurrent sessions read and write
+    the cache without failing on "database is locked". Expired entries are
+    purged on open so the file does not grow without bound.
+    """
+    conn = sqlite3.connect(get_page_cache_path(), timeout=PAGE_CACHE_TIMEOUT_SECONDS)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_data_cache (
+                site_url TEXT,
+                keyword TEXT,
+                month_start TEXT,
+                rows TEXT,
+                expires_at REAL,
+                PRIMARY KEY (site_url, keyword, month_start)
+            )
+        """)
+    except Exception:
+        conn.close()
+        raise
+    
+    try:
+        with conn:
+            conn.execute(
+                "DELETE FROM page_data_cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Could not purge expired page-data cache entries: {e}")
+    
+    return conn
+
+
+def _read_page_cache(
+    conn: sqlite3.Connection,
+    site_url: str,
+    keywords: List[str],
+    month_start: str
+) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Look up cached monthly page data for keywords.
+    
+    Returns a dict containing only the cache hits, mapping keyword to its
+    monthly frame (None if the keyword is cached as having no data).
+    """
+    year_month = month_start[:7]  # month_start is always YYYY-MM-01
+    hits = {}
+    now = time.time()
+    
+    # Stay under SQLite's bound-parameter limit
+    for i in range(0, len(keywords), 900):
+        chunk = keywords[i:i + 900]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"""
+            SELECT keyword, rows FROM page_data_cache
+            WHERE site_url = ? AND month_start = ? AND keyword IN ({placeholders})
+              AND (expires_at IS NULL OR expires_at > ?)
+            """,
+            (site_url, month_start, *chunk, now)
+        )
+        for keyword, rows_json in cursor:
+            records = json.loads(rows_json)
+            if not records:
+                hits[keyword] = None
                 continue
-            else:
-                logger.error(f"API error: {e}")
-                raise
-        except Exception as e:
-            logger.error(f"Error fetching keywords: {e}")
-            raise
+            hits[keyword] = pd.DataFrame(records, columns=PAGE_CACHE_COLUMNS).assign(
+                query=keyword,
+                year_month=year_month
+            )[['query', 'page', 'year_month', 'clicks', 'impressions', 'position', 'ctr']]
     
-    # Apply filters in code (API doesn't support metric filtering)
-    for keyword, metrics in keyword_metrics.items():
-        if min_impressions > 0 and metrics['impressions'] < min_impressions:
-            continue
-        if min_clicks is not None and min_clicks > 0 and metrics['clicks'] < min_clicks:
-            continue
-        all_keywords.append(keyword)
+    return hits
+
+
+def _write_page_cache(
+    conn: sqlite3.Connection,
+    site_url: str,
+    keywords: List[str],
+    month_start: str,
+    month_end: str,
+    month_df: Optional[pd.DataFrame]
+) -> None:
+    """
+    Store a successfully fetched month for each keyword (empty if it had no rows).
     
-    # Apply keyword pattern filter if provided
-    if keyword_pattern:
-        import re
-        pattern = re.compile(keyword_pattern, re.IGNORECASE)
-        all_keywords = [kw for kw in all_keywords if pattern.search(kw)]
+    Months older than a few days are final in GSC and never expire; recent
+    months expire so they are refreshed as data fills in.
+    """
+    settled_before = (datetime.now() - timedelta(days=RECENT_DATA_DAYS)).strftime('%Y-%m-%d')
+    expires_at = None if month_end < settled_before else time.time() + RECENT_MONTH_CACHE_TTL_SECONDS
+    
+    groups = {}
+    if month_df is not None:
+        groups = {keyword: group for keyword, group in month_df.groupby('query', sort=False)}
+    
+    entries = []
+    for keyword in keywords:
+        records = groups[keyword][PAGE_CACHE_COLUMNS].to_dict('records') if keyword in groups else []
+        entries.append((site_url, keyword, month_start, json.dumps(records), expires_at))
     
-    return all_keywords
+    # A failed cache write only costs a refetch later; the fetched data is
+    # still returned
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_data_cache VALUES (?, ?, ?, ?, ?)",
+                entries
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Could not cache page data for {month_start}: {e}")
 
 
-def fetch_keyword_page_data(
+def _re2_escape(text: str) -> str:
+    """
+    Escape regex metacharacters for GSC's RE2 engine.
+    
+    re.escape also escapes spaces and other characters RE2 does not accept
+    as escapes, so only the actual metacharacters are escaped here.
+    """
+    return _RE2_METACHARACTERS.sub(r'\\\g<0>', text)
+
+
+def _chunk_keywords_for_regex(keywords: List[str]) -> List[List[str]]:
+    """
+    Split keywords into groups whose anchored alternation regex fits the GSC limit.
+    """
+    chunks = []
+    current = []
+    current_length = 0
+    
+    for keyword in keywords:
+        escaped_length = len(_re2_escape(keyword)) + 1  # +1 for the '|' separator
+        if current and current_length + escaped_length > MAX_REGEX_FILTER_LENGTH:
+            chunks.append(current)
+            current = []
+            current_length = 0
+        current.append(keyword)
+        current_length += escaped_length
+    
+    if current:
+        chunks.append(current)
+    
+    return chunks
+
+
+def _fetch_month_rows(
     service,
     site_url: str,
-    keyword: str,
+    expression: str,
+    month_start: str,
+    month_end: str,
+    wanted: set
+) -> Optional[pd.DataFrame]:
+    """
+    Fetch and aggregate all (query, page, date) rows for one month and keyword chunk.
+    
+    Paginates until a short page is returned. Returns None if nothing matched.
+    Errors are raised so the caller can tell an empty month from a failed one.
+    """
+    year_month = month_start[:7]  # month_start is always YYYY-MM-01
+    month_rows = []
+    start_row = 0
+    
+    while True:
+        request = {
+            'startDate': month_start,
+            'endDate': month_end,
+            'dimensions': ['query', 'page', 'date'],
+            'dimensionFilterGroups': [{
+                'filters': [{
+                    'dimension': 'query',
+                    'expression': expression,
+                    'operator': 'includingRegex'
+                }]
+            }],
+            'rowLimit': MAX_ROWS_PER_REQUEST,
+            'startRow': start_row
+        }
+        
+        response = _execute(service.searchanalytics().query(siteUrl=site_url, body=request))
+        
+        rows = response.get('rows', [])
+        # Guard against regex matches that are not exact keyword hits
+        month_rows.extend(row for row in rows if row['keys'][0] in wanted)
+        
+        # Last page for this month
+        if len(rows) < MAX_ROWS_PER_REQUEST:
+            break
+        
+        start_row += MAX_ROWS_PER_REQUEST
+    
+    return _aggregate_monthly_rows(month_rows, year_month)
+
+
+def fetch_keywords_page_data_bulk(
+    service,
+    site_url: str,
+    keywords: List[str],
     start_date: str = '2024-10-01',
-    progress_callback: Optional[callable] = None
-) -> pd.DataFrame:
+    progress_callback: Optional[callable] = None,
+    max_workers: int = MAX_FETCH_WORKERS
+) -> Optional[pd.DataFrame]:
     """
-    Fetch page-level data for a specific keyword, aggregated monthly.
+    Fetch page-level data for many keywords at once, aggregated monthly.
     
-    For each month, makes one API call and aggregates daily data to monthly.
-    Returns exactly 1 row per month per keyword+page combination.
+    Instead of one API call per keyword per month, all keywords are matched
+    by a single anchored regex filter (``^(kw1|kw2|...)$``). The GSC API does
+    not support OR-ed filter groups, so the regex is the way to select several
+    exact queries in one request. Keyword lists too long for one expression
+    are split into a few chunks.
+    
+    Each (chunk, month) pair is fetched concurrently on a thread pool, so wall
+    time is bounded by network latency / max_workers rather than the sum of
+    all round trips. Months already in the local page-data cache are not
+    requested again.
     
     Args:
         service: GSC API service object
         site_url: Site URL (e.g., 'sc-domain:example.com')
-        keyword: Search query keyword
+        keywords: Search query keywords
         start_date: Start date in YYYY-MM-DD format
-        progress_callback: Optional callback(current_month, total_months)
+        progress_callback: Optional callback(completed_months, total_months)
+        max_workers: Maximum number of concurrent API requests
         
     Returns:
         DataFrame with columns: query, page, year_month, clicks, impressions, position, ctr
-        (One row per month per page)
+        (One row per month per keyword+page), or None if no data was found
     """
+    if not keywords:
+        return None
+    
     monthly_ranges = generate_monthly_ranges(start_date)
-    all_data = []
-    total_months = len(monthly_ranges)
+    keyword_list = list(keywords)
+    wanted = set(keyword_list)
     
-    for idx, (month_start, month_end) in enumerate(monthly_ranges, 1):
-        if progress_callback:
-            progress_callback(idx, total_months)
-        
-        try:
-            request = {
-                'startDate': month_start,
-                'endDate': month_end,
-                'dimensions': ['query', 'page', 'date'],
-                'dimensionFilterGroups': [{
-                    'filters': [{
-                        'dimension': 'query',
-                        'expression': keyword,
-                        'operator': 'equals'
-                    }]
-                }],
-                'rowLimit': MAX_ROWS_PER_REQUEST
-            }
-            
-            response = service.searchanalytics().query(
-                siteUrl=site_url,
-                body=request
-            ).execute()
-            
-            if 'rows' in response:
-                # Group by page and aggregate to monthly
-                page_data = {}
-                
-                for row in response['rows']:
-                    # Extract dimensions
-                    query = row['keys'][0]  # query
-                    page = row['keys'][1]  # page
-                    date = row['keys'][2]  # date (daily)
-                    
-                    # Initialize page if not seen
-                    if page not in page_data:
-                        page_data[page] = {
-                            'clicks': 0,
-                            'impressions': 0,
-                            'position_sum': 0,
-                            'ctr_sum': 0
-                        }
-                    
-                    # Aggregate: sum clicks/impressions, accumulate position/ctr for averaging
-                    page_data[page]['clicks'] += row['clicks']
-                    page_data[page]['impressions'] += row['impressions']
-                    page_data[page]['position_sum'] += row['position'] * row['impressions']  # Weighted average
-                    page_data[page]['ctr_sum'] += row['ctr'] * row['impressions']  # Weighted average
-                
-                # Create monthly aggregated rows (1 per page per month)
-                year_month = datetime.strptime(month_start, '%Y-%m-%d').strftime('%Y-%m')
+    all_data = []
+    cache = _open_page_cache()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for month_start, month_end in monthly_ranges:
+                # Only keywords without a cached result for this month are fetched
+                hits = _read_page_cache(cache, site_url, keyword_list, month_start)
+                all_data.extend(df for df in hits.values() if df is not None)
+                missing = [kw for kw in keyword_list if kw not in hits]
                 
-                for page, data in page_data.items():
-                    # Calculate weighted averages
-                    if data['impressions'] > 0:
-                        avg_position = data['position_sum'] / data['impressions']
-                        avg_ctr = data['ctr_sum'] / data['impressions']
-                    else:
-                        avg_position = 0
-                        avg_ctr = 0
-                    
-                    all_data.append({
-                        'query': keyword,
-                        'page': page,
-                        'year_month': year_month,
-                        'clicks': data['clicks'],
-                        'impressions': data['impressions'],
-                        'position': avg_position,
-                        'ctr': avg_ctr
-                    })
+                for chunk in _chunk_keywords_for_regex(missing):
+                    expression = '^(' + '|'.join(_re2_escape(kw) for kw in chunk) + ')$'
+                    future = executor.submit(
+                        _fetch_month_rows,
+                        service,
+                        site_url,
+                        expression,
+                        month_start,
+                        month_end,
+                        wanted
+                    )
+                    futures[future] = (chunk, month_start, month_end)
             
-            # Throttle to respect rate limits
-            time.sleep(REQUEST_DELAY_SECONDS)
-        
-        except HttpError as e:
-            if e.resp.status == 429:  # Quota exceeded
-                logger.warning(f"Rate limit exceeded for {month_start}, waiting...")
-                time.sleep(60)  # Wait 1 minute
-                continue
-            else:
-                logger.error(f"API error for {month_start}: {e}")
-                continue
-        except Exception as e:
-            logger.error(f"Error fetching data for {month_start} to {month_end}: {e}")
-            continue
+            total = len(futures)
+            for completed, future in enumerate(as_completed(futures), 1):
+                chunk, month_start, month_end = futures[future]
+                try:
+                    month_df = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching data for {month_start} to {month_end}: {e}")
+                else:
+                    if month_df is not None:
+                        all_data.append(month_df)
+                    _write_page_cache(cache, site_url, chunk, month_start, month_end, month_df)
+                
+                if progress_callback:
+                    progress_callback(completed, total)
+    finally:
+        cache.close()
     
     if not all_data:
-        return pd.DataFrame(columns=['query', 'page', 'year_month', 'clicks', 'impressions', 'position', 'ctr'])
+        return None
     
-    df = pd.DataFrame(all_data)
-    return df
+    return pd.concat(all_data, ignore_index=True)
+
+
+def fetch_keyword_page_data(
+    service,
+    site_url: str,
+    keyword: str,
+    start_date: str = '2024-10-01',
+    progress_callback: Optional[callable] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Fetch page-level data for a specific keyword, aggregated monthly.
+    
+    Goes through fetch_keywords_page_data_bulk, so a single keyword shares
+    its page-data cache, concurrency and retry/backoff handling.
+    Returns exactly 1 row per month per keyword+page combination.
+    
+    Args:
+        service: GSC API service object
+        site_url: Site URL (e.g., 'sc-domain:example.com')
+        keyword: Search query keyword
+        start_date: Start date in YYYY-MM-DD format
+        progress_callback: Optional callback(completed_months, total_months)
+        
+    Returns:
+        DataFrame with columns: query, page, year_month, clicks, impressions, position, ctr
+        (One row per month per page), or None if no data was found
+    """
+    return fetch_keywords_page_data_bulk(
+        service,
+        site_url,
+        [keyword],
+        start_date,
+        progress_callback
+    )
 
 
 def pivot_to_monthly_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -410,25 +952,25 @@ def pivot_to_monthly_columns(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
     
-    # Convert year_month to string format (YYYY-MM)
-    df['month'] = df['year_month'].astype(str)
-    
-    # Melt metrics
     metrics = ['clicks', 'impressions', 'position', 'ctr']
-    melted = df.melt(
-        id_vars=['query', 'page', 'month'],
-        value_vars=metrics,
-        var_name='metric',
-        value_name='value'
-    )
     
-    # Pivot to get months as columns
-    pivoted = melted.pivot_table(
-        index=['query', 'page', 'metric'],
-        columns='month',
-        values='value',
-        aggfunc='first'
-    ).reset_index()
+    # (query, page, month) is unique after monthly aggregation, so a plain
+    # stack/unstack reshape replaces melt + pivot_table's hash aggregation
+    keyed = df.set_index([
+        df['query'],
+        df['page'],
+        df['year_month'].astype(str).rename('month')
+    ])[metrics]
+    if not keyed.index.is_unique:
+        keyed = keyed.groupby(level=['query', 'page', 'month']).first()
+    
+    pivoted = (
+        keyed.rename_axis(columns='metric')
+        .stack()
+        .unstack('month')
+        .sort_index()
+        .reset_index()
+    )
     
     # Rename columns
     pivoted.columns.name = None
@@ -442,5 +984,12 @@ def pivot_to_monthly_columns(df: pd.DataFrame) -> pd.DataFrame:
     month_cols = sorted([c for c in pivoted.columns if c not in ['Keyword', 'Page', 'Metric']])
     pivoted = pivoted[['Keyword', 'Page', 'Metric'] + month_cols]
     
+    # Month columns stay float64: they mix fractional metrics (position, ctr)
+    # with clicks and impressions, which float32 cannot hold exactly past 2**24
+    
+    # Categorical labels: compact storage and integer-code equality filters
+    for col in ['Keyword', 'Page', 'Metric']:
+        pivoted[col] = pivoted[col].astype('category')
+    
     return pivoted
 
@@ -2,17 +2,23 @@
 First-run setup module
 Handles authentication, property selection, and keyword import
 """
+import os
+import re
+import json
 import sqlite3
 import logging
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 from datetime import datetime, timedelta
 
 import streamlit as st
 from modules.gsc_client import (
     get_gsc_service,
+    has_gsc_service,
     list_sites,
-    fetch_keywords_with_pagination
+    iter_keyword_pages
 )
 from modules.utils import (
     get_db_path,
@@ -23,11 +29,69 @@ from modules.utils import (
 
 logger = logging.getLogger(__name__)
 
+# Schema is checked once per process
+_DB_INITIALIZED = False
+_db_init_lock = threading.Lock()
 
-def init_database():
-    """Initialize the keywords database."""
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
+# Whether keywords can be upserted in place; needs SQLite 3.24+ and a
+# (keyword, domain) primary key, which tables migrated from the
+# pre-domain schema may not have
+_KEYWORDS_UPSERT = False
+
+# Escapes, character classes and group openers scanned when checking a
+# keyword pattern for constructs Python accepts but GSC's RE2 engine
+# rejects. Character classes are matched whole so the characters inside
+# them (e.g. '[++]') are not mistaken for quantifiers. RE2 only knows the
+# i, m and s inline flags of those Python accepts.
+_PATTERN_TOKENS = re.compile(
+    r'\\.'
+    r'|\[\^?\]?(?:\\.|[^\]\\])*\]'
+    r'|\(\?(?:<=|<!|=|!|>|\(|P=|#|[aiLmsux-]*[aLux])'
+    r'|[*+?}]\+'
+)
+_RE2_UNSUPPORTED_ESCAPES = set('123456789Z')
+
+# Keyword insert statements, kept constant so the import connection's
+# statement cache reuses the prepared statement for every page. Existing
+# keywords are updated in place; imported_at is filled in by the column
+# default.
+_INSERT_SQL = """
+    INSERT INTO keywords (keyword, domain, import_criteria)
+    VALUES (?, ?, ?)
+    ON CONFLICT(keyword, domain) DO UPDATE SET
+        import_criteria = excluded.import_criteria,
+        imported_at = CURRENT_TIMESTAMP
+"""
+_LEGACY_INSERT_SQL = """
+    INSERT OR REPLACE INTO keywords (keyword, domain, import_criteria)
+    VALUES (?, ?, ?)
+"""
+
+
+def init_database(conn: Optional[sqlite3.Connection] = None):
+    """
+    Initialize the keywords database.
+    
+    Uses the given connection if provided (left open), otherwise opens and
+    closes its own. Only the first successful call per process does any work.
+    """
+    global _DB_INITIALIZED
+    if _DB_INITIALIZED:
+        return
+    
+    with _db_init_lock:
+        if _DB_INITIALIZED:
+            return
+        _init_database(conn)
+        _DB_INITIALIZED = True
+
+
+def _init_database(conn: Optional[sqlite3.Connection] = None):
+    """Create or migrate the keywords table."""
+    global _KEYWORDS_UPSERT
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(get_db_path())
     cursor = conn.cursor()
     
     # Check if table exists and has domain column
@@ -48,7 +112,8 @@ def init_database():
             except sqlite3.OperationalError as e:
                 logger.warning(f"Could not add domain column: {e}")
     else:
-        # Create new table with domain column
+        # Create new table with domain column; WITHOUT ROWID stores rows in
+        # the primary key B-tree instead of a separate rowid table
         conn.execute("""
             CREATE TABLE keywords (
                 keyword TEXT,
@@ -56,63 +121,145 @@ def init_database():
                 imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 import_criteria TEXT,
                 PRIMARY KEY (keyword, domain)
-            )
+            ) WITHOUT ROWID
         """)
         conn.commit()
     
-    conn.close()
+    # Covering index: DISTINCT/ORDER BY keyword per domain is served by an
+    # index-only scan instead of a temp B-tree sort
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_keywords_domain_kw ON keywords(domain, keyword)")
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Could not create keywords index: {e}")
+    
+    cursor.execute("PRAGMA table_info(keywords)")
+    primary_key = {col[1] for col in cursor.fetchall() if col[5]}
+    _KEYWORDS_UPSERT = (
+        primary_key == {'keyword', 'domain'}
+        and sqlite3.sqlite_version_info >= (3, 24, 0)
+    )
+    
+    if owns_conn:
+        conn.close()
 
 
-def save_keywords(keywords: List[str], domain: str, import_criteria: Dict[str, Any]):
-    """Save keywords to database."""
-    init_database()
-    
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
-    
-    criteria_json = str(import_criteria)
-    
-    for keyword in keywords:
-        conn.execute("""
-            INSERT OR REPLACE INTO keywords (keyword, domain, imported_at, import_criteria)
-            VALUES (?, ?, ?, ?)
-        """, (keyword, domain, datetime.now(), criteria_json))
+def _connect_for_import() -> sqlite3.Connection:
+    """Open a connection owned by one import, tuned for bulk writes."""
+    conn = sqlite3.connect(get_db_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _re2_unsupported_construct(pattern: str) -> Optional[str]:
+    """
+    Find a regex construct RE2 does not support.
+    
+    Returns the first lookaround, atomic group, conditional, comment group,
+    unsupported inline flag (a, L, u, x), backreference, \\Z anchor or
+    possessive quantifier in pattern, or None if there is none.
+    """
+    for match in _PATTERN_TOKENS.finditer(pattern):
+        token = match.group()
+        if token[0] == '[':
+            continue
+        if token[0] != '\\' or token[1] in _RE2_UNSUPPORTED_ESCAPES:
+            return token
+    return None
+
+
+def save_keyword_pages(pages: Iterable[Iterable[str]], domain: str, import_criteria: Dict[str, Any]) -> int:
+    """
+    Save keywords to database, committing one page at a time.
+    
+    pages may be a lazy iterable (e.g. fetching from the API); no transaction
+    is open while the next page is produced, so a failure part-way keeps the
+    pages already saved. Duplicates are skipped. Returns the number of unique
+    keywords saved.
+    """
+    conn = _connect_for_import()
+    try:
+        init_database(conn)
+        
+        criteria_json = json.dumps(import_criteria, separators=(',', ':'), default=str)
+        sql = _INSERT_SQL if _KEYWORDS_UPSERT else _LEGACY_INSERT_SQL
+        seen = set()
+        
+        for page in pages:
+            # Sorting keeps inserts close together in the primary key B-tree
+            new_keywords = sorted(set(page).difference(seen))
+            if not new_keywords:
+                continue
+            
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(sql, ((keyword, domain, criteria_json) for keyword in new_keywords))
+            seen.update(new_keywords)
+        
+        # Refresh query planner statistics after a bulk change
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
     
-    conn.commit()
-    conn.close()
+    return len(seen)
+
+
+def save_keywords(keywords: Iterable[str], domain: str, import_criteria: Dict[str, Any]) -> int:
+    """Save keywords to database in a single transaction. Returns the number of unique keywords saved."""
+    return save_keyword_pages([keywords], domain, import_criteria)
 
 
 def check_credentials_file() -> bool:
-    """Check if credentials file exists."""
+    """
+    Check if credentials file exists.
+    
+    Once found, the result is kept in session state until the user clicks
+    "Check Again" in Step 1.
+    """
+    if st.session_state.get('creds_present'):
+        return True
+    
     from modules.utils import get_credentials_path
-    return get_credentials_path().exists()
+    present = os.path.lexists(get_credentials_path())
+    if present:
+        st.session_state.creds_present = True
+    return present
+
+
+SETUP_STEPS = (
+    ("Setup Credentials", "Get your Google OAuth credentials file"),
+    ("Authenticate", "Connect your Google account"),
+    ("Select Property", "Choose your GSC property"),
+    ("Import Keywords", "Fetch keywords from GSC")
+)
+
+
+@lru_cache(maxsize=None)
+def _step_progress_markdown(current_step: int) -> tuple:
+    """Markdown for each step's column, built once per current step."""
+    blocks = []
+    for idx, (step_name, step_desc) in enumerate(SETUP_STEPS, 1):
+        if idx < current_step:
+            # Completed step
+            blocks.append(f"✅ **Step {idx}**\n\n*{step_name}*")
+        elif idx == current_step:
+            # Current step
+            blocks.append(f"🔄 **Step {idx}**\n\n**{step_name}**")
+        else:
+            # Future step
+            blocks.append(f"⏳ **Step {idx}**\n\n*{step_name}*")
+    return tuple(blocks)
 
 
 def show_step_progress(current_step: int):
     """Display step progress indicator."""
-    steps = [
-        ("Setup Credentials", "Get your Google OAuth credentials file"),
-        ("Authenticate", "Connect your Google account"),
-        ("Select Property", "Choose your GSC property"),
-        ("Import Keywords", "Fetch keywords from GSC")
-    ]
-    
-    # Create columns for steps
-    cols = st.columns(4)
-    for idx, (step_name, step_desc) in enumerate(steps, 1):
-        with cols[idx - 1]:
-            if idx < current_step:
-                # Completed step
-                st.markdown(f"✅ **Step {idx}**")
-                st.markdown(f"*{step_name}*")
-            elif idx == current_step:
-                # Current step
-                st.markdown(f"🔄 **Step {idx}**")
-                st.markdown(f"**{step_name}**")
-            else:
-                # Future step
-                st.markdown(f"⏳ **Step {idx}**")
-                st.markdown(f"*{step_name}*")
+    # Create columns for steps, one markdown element each
+    cols = st.columns(len(SETUP_STEPS))
+    for col, block in zip(cols, _step_progress_markdown(current_step)):
+        col.markdown(block)
     
     st.markdown("---")
 
@@ -124,30 +271,31 @@ def run_setup_flow():
     
     # Initialize setup step (start at 1, not 0)
     # Only set to 1 if not already set (allows jumping to Step 4 for imports)
-    if 'setup_step' not in st.session_state:
-        st.session_state.setup_step = 1
-    # If setup_step is None or invalid, reset to 1
-    elif st.session_state.setup_step not in [1, 2, 3, 4]:
-        st.session_state.setup_step = 1
+    session_state = st.session_state
+    step = session_state.get('setup_step')
+    # If setup_step is missing, None or invalid, reset to 1
+    if step not in (1, 2, 3, 4):
+        step = 1
+        session_state.setup_step = step
     
     # Don't show setup flow if setup is already complete (unless explicitly going to Step 4)
-    if st.session_state.get('setup_complete') is True and st.session_state.setup_step != 4:
+    if session_state.get('setup_complete') is True and step != 4:
         # Setup is complete, redirect to main app
         st.info("✅ Setup already complete! Redirecting to main app...")
         st.rerun()
         return
     
     # Show step progress
-    show_step_progress(st.session_state.setup_step)
+    show_step_progress(step)
     
     # Route to appropriate step
-    if st.session_state.setup_step == 1:
+    if step == 1:
         step1_credentials_setup()
-    elif st.session_state.setup_step == 2:
+    elif step == 2:
         step2_authentication()
-    elif st.session_state.setup_step == 3:
+    elif step == 3:
         step3_property_selection()
-    elif st.session_state.setup_step == 4:
+    elif step == 4:
         step4_keyword_import()
 
 
@@ -161,7 +309,7 @@ def step1_credentials_setup():
     creds_path = get_credentials_path()
     
     # Check if file exists
-    if creds_path.exists():
+    if check_credentials_file():
         st.success(f"✅ Credentials file found at `{creds_path}`")
         if st.button("Continue to Step 2 →", type="primary"):
             st.session_state.setup_step = 2
@@ -218,6 +366,7 @@ def step1_credentials_setup():
     col1, col2 = st.columns([1, 3])
     with col1:
         if st.button("🔄 Check Again", type="primary"):
+            st.session_state.pop('creds_present', None)
             st.rerun()
     
     st.markdown("---")
@@ -238,7 +387,7 @@ def step2_authentication():
         return
     
     # Check if already authenticated
-    if 'gsc_service' in st.session_state and st.session_state.gsc_service is not None:
+    if has_gsc_service():
         st.success("✅ Already authenticated!")
         if st.button("Continue to Step 3 →", type="primary"):
             st.session_state.setup_step = 3
@@ -265,9 +414,6 @@ def step2_authentication():
                 # This will open a browser and wait for OAuth callback
                 service = get_gsc_service()
                 
-                # Store service in session state
-                st.session_state.gsc_service = service
-                
                 # Verify the service works by trying to list sites
                 try:
                     test_sites = list_sites(service)
@@ -324,22 +470,20 @@ def step3_property_selection():
     st.header("Step 3: Select GSC Property")
     st.markdown("Choose which Google Search Console property you want to analyze.")
     
-    # Get service - try session state first, then get fresh one
-    service = None
-    if 'gsc_service' in st.session_state and st.session_state.gsc_service is not None:
-        service = st.session_state.gsc_service
-    else:
-        try:
+    # Get service - reuse the one already built, otherwise authenticate
+    try:
+        if has_gsc_service():
+            service = get_gsc_service()
+        else:
             with st.spinner("Re-authenticating..."):
                 service = get_gsc_service()
-                st.session_state.gsc_service = service
-        except Exception as e:
-            st.error(f"Could not authenticate: {e}")
-            st.info("Please go back to Step 2 and try authenticating again.")
-            if st.button("← Back to Step 2"):
-                st.session_state.setup_step = 2
-                st.rerun()
-            return
+    except Exception as e:
+        st.error(f"Could not authenticate: {e}")
+        st.info("Please go back to Step 2 and try authenticating again.")
+        if st.button("← Back to Step 2"):
+            st.session_state.setup_step = 2
+            st.rerun()
+        return
     
     try:
         with st.spinner("Loading properties..."):
@@ -353,9 +497,8 @@ def step3_property_selection():
         previous_site = st.session_state.get('selected_site') or load_config().get('site_url')
         
         # Find index of previously selected site, or default to 0
-        default_index = 0
-        if previous_site and previous_site in sites:
-            default_index = sites.index(previous_site)
+        sites_index = {site: idx for idx, site in enumerate(sites)}
+        default_index = sites_index.get(previous_site, 0)
         
         selected_site = st.selectbox(
             "Select a property:",
@@ -395,22 +538,20 @@ def step4_keyword_import():
     st.header("Step 4: Import Keywords")
     st.markdown("Configure how you want to import keywords from Google Search Console.")
     
-    # Get service - try session state first, then get fresh one
-    service = None
-    if 'gsc_service' in st.session_state and st.session_state.gsc_service is not None:
-        service = st.session_state.gsc_service
-    else:
-        try:
+    # Get service - reuse the one already built, otherwise authenticate
+    try:
+        if has_gsc_service():
+            service = get_gsc_service()
+        else:
             with st.spinner("Re-authenticating..."):
                 service = get_gsc_service()
-                st.session_state.gsc_service = service
-        except Exception as e:
-            st.error(f"Could not authenticate: {e}")
-            st.info("Please go back to Step 2 and try authenticating again.")
-            if st.button("← Back to Step 2"):
-                st.session_state.setup_step = 2
-                st.rerun()
-            return
+    except Exception as e:
+        st.error(f"Could not authenticate: {e}")
+        st.info("Please go back to Step 2 and try authenticating again.")
+        if st.button("← Back to Step 2"):
+            st.session_state.setup_step = 2
+            st.rerun()
+        return
     
     # Get selected site - prioritize session state, fallback to config
     if 'selected_site' not in st.session_state:
@@ -473,6 +614,24 @@ def step4_keyword_import():
     if keyword_pattern == "":
         keyword_pattern = None
     
+    # Reject a malformed pattern here rather than after an API round trip
+    pattern_valid = True
+    if keyword_pattern:
+        try:
+            re.compile(keyword_pattern)
+        except re.error as e:
+            st.error(f"Invalid keyword pattern: {e}")
+            pattern_valid = False
+        else:
+            unsupported = _re2_unsupported_construct(keyword_pattern)
+            if unsupported:
+                st.error(
+                    f"Keyword pattern uses `{unsupported}`, which Google Search Console's "
+                    "regex engine (RE2) does not support (no lookarounds, backreferences, "
+                    "possessive quantifiers, comments or the a/L/u/x flags)."
+                )
+                pattern_valid = False
+    
     # Estimate
     st.markdown("---")
     st.info("💡 **Tip**: Larger date ranges and lower thresholds will import more keywords and take longer.")
@@ -484,10 +643,10 @@ def step4_keyword_import():
             st.rerun()
     
     with col2:
-        if st.button("🚀 Start Import", type="primary"):
+        if st.button("🚀 Start Import", type="primary", disabled=not pattern_valid):
             import_keywords(
                 service,
-                st.session_state.selected_site,
+                site_to_use,
                 start_date.strftime('%Y-%m-%d'),
                 end_date.strftime('%Y-%m-%d'),
                 min_impressions,
@@ -521,9 +680,19 @@ def import_keywords(
     
     try:
         with status_container:
-            st.info("Fetching keywords from Google Search Console...")
+            st.info("Fetching keywords from Google Search Console and saving to database...")
+        
+        import_criteria = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'min_impressions': min_impressions,
+            'min_clicks': min_clicks,
+            'keyword_pattern': keyword_pattern
+        }
         
-        keywords = fetch_keywords_with_pagination(
+        # Each page of keywords is committed as it arrives rather than
+        # collecting the full list first
+        pages = iter_keyword_pages(
             service,
             site_url,
             start_date,
@@ -533,20 +702,7 @@ def import_keywords(
             keyword_pattern=keyword_pattern,
             progress_callback=progress_callback
         )
-        
-        with status_container:
-            st.info(f"Found {len(keywords)} keywords. Saving to database...")
-        
-        # Save keywords
-        import_criteria = {
-            'start_date': start_date,
-            'end_date': end_date,
-            'min_impressions': min_impressions,
-            'min_clicks': min_clicks,
-            'keyword_pattern': keyword_pattern
-        }
-        
-        save_keywords(keywords, site_url, import_criteria)
+        keyword_count = save_keyword_pages(pages, site_url, import_criteria)
         
         # Update config
         config = load_config()
@@ -561,11 +717,11 @@ def import_keywords(
         progress_container.empty()
         status_container.empty()
         
-        st.success(f"✅ Successfully imported {len(keywords)} keywords!")
+        st.success(f"✅ Successfully imported {keyword_count} keywords!")
         
         st.markdown("---")
         st.markdown("### Import Summary")
-        st.write(f"- **Total keywords**: {len(keywords)}")
+        st.write(f"- **Total keywords**: {keyword_count}")
         st.write(f"- **Date range**: {start_date} to {end_date}")
         st.write(f"- **Minimum impressions**: {min_impressions}")
         if min_clicks:
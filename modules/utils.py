@@ -3,45 +3,101 @@ Utility functions for GSC Explorer
 """
 import os
 import json
+import atexit
+import sqlite3
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+# Process-wide connection to the keywords database, opened on first use
+_db_conn: Optional[sqlite3.Connection] = None
+_db_conn_lock = threading.Lock()
 
+
+@lru_cache(maxsize=None)
 def get_project_root() -> Path:
     """Get the project root directory."""
     return Path(__file__).parent.parent
 
 
+@lru_cache(maxsize=None)
 def get_data_dir() -> Path:
-    """Get the data directory, creating it if needed."""
-    data_dir = get_project_root() / 'data'
+    """Get the data directory."""
+    return get_project_root() / 'data'
+
+
+@lru_cache(maxsize=None)
+def _ensure_data_dir() -> Path:
+    """Create the data directory (once per process) and return it."""
+    data_dir = get_data_dir()
     data_dir.mkdir(exist_ok=True)
     return data_dir
 
 
+@lru_cache(maxsize=None)
+def get_cache_dir() -> Path:
+    """Get the cache directory for derived data, creating it if needed."""
+    cache_dir = _ensure_data_dir() / 'cache'
+    cache_dir.mkdir(exist_ok=True)
+    return cache_dir
+
+
+@lru_cache(maxsize=None)
 def get_config_dir() -> Path:
     """Get the config directory."""
     return get_project_root() / 'config'
 
 
+@lru_cache(maxsize=None)
 def get_token_path() -> Path:
     """Get the path to token.json."""
     return get_project_root() / 'token.json'
 
 
+@lru_cache(maxsize=None)
 def get_credentials_path() -> Path:
     """Get the path to gsc_credentials.json."""
     return get_project_root() / 'gsc_credentials.json'
 
 
+@lru_cache(maxsize=None)
 def get_config_path() -> Path:
     """Get the path to config.json."""
     return get_config_dir() / 'config.json'
 
 
+@lru_cache(maxsize=None)
 def get_db_path() -> Path:
-    """Get the path to keywords database."""
-    return get_data_dir() / 'keywords.db'
+    """Get the path to keywords database (its directory is created if needed)."""
+    return _ensure_data_dir() / 'keywords.db'
+
+
+@lru_cache(maxsize=None)
+def get_page_cache_path() -> Path:
+    """Get the path to the fetched page-data cache database (its directory is created if needed)."""
+    return _ensure_data_dir() / 'gsc_cache.db'
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Get the shared, read-tuned connection to the keywords database.
+    
+    Opened once per process (usable from any thread) and closed at exit, so
+    reruns do not pay for a new connection and its page cache stays warm.
+    """
+    global _db_conn
+    if _db_conn is None:
+        with _db_conn_lock:
+            if _db_conn is None:
+                conn = sqlite3.connect(get_db_path(), check_same_thread=False, cached_statements=256)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA mmap_size=268435456")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                atexit.register(conn.close)
+                _db_conn = conn
+    return _db_conn
 
 
 def load_config() -> Dict[str, Any]:
@@ -51,8 +107,7 @@ def load_config() -> Dict[str, Any]:
         return {}
     
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return json.loads(config_path.read_text())
     except Exception:
         return {}
 
@@ -60,10 +115,8 @@ def load_config() -> Dict[str, Any]:
 def save_config(config: Dict[str, Any]) -> None:
     """Save configuration to config.json."""
     config_path = get_config_path()
-    config_path.parent.mkdir(exist_ok=True)
-    
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(json.dumps(config, indent=2))
 
 
 def is_first_run() -> bool:
@@ -75,27 +128,23 @@ def is_first_run() -> bool:
     - Database doesn't exist, OR
     - Database exists but has no keywords
     """
-    token_exists = get_token_path().exists()
-    db_exists = get_db_path().exists()
+    token_exists = os.path.lexists(get_token_path())
+    db_exists = os.path.lexists(get_db_path())
     
     if not token_exists or not db_exists:
         return True
     
     # Check if database has keywords
     try:
-        import sqlite3
-        conn = sqlite3.connect(get_db_path())
+        conn = get_db_connection()
         # Check if table exists first
         cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='keywords'")
         if not cursor.fetchone():
-            conn.close()
             return True
         
-        cursor = conn.execute("SELECT COUNT(*) FROM keywords")
-        keyword_count = cursor.fetchone()[0]
-        conn.close()
-        
-        return keyword_count == 0
+        # Only need to know whether any row exists, not how many
+        cursor = conn.execute("SELECT 1 FROM keywords LIMIT 1")
+        return cursor.fetchone() is None
     except Exception:
         # If table doesn't exist or error, treat as first run
         return True
@@ -111,10 +160,18 @@ def generate_monthly_ranges(start_date_str: str = '2024-10-01') -> list:
     Returns:
         List of tuples: [(start_date, end_date), ...]
     """
+    from datetime import date
+    
+    # The ranges only change when the day does
+    return list(_monthly_ranges(start_date_str, date.today()))
+
+
+@lru_cache(maxsize=32)
+def _monthly_ranges(start_date_str: str, end_date) -> tuple:
+    """Month ranges from start_date_str up to end_date (a date), as a tuple."""
     from datetime import datetime, timedelta
     
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-    end_date = datetime.now()
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
     
     months = []
     current = start_date.replace(day=1)  # Start of first month
@@ -139,5 +196,4 @@ def generate_monthly_ranges(start_date_str: str = '2024-10-01') -> list:
         
         current = next_month
     
-    return months
-
+    return tuple(months)